@@ -1,15 +1,17 @@
 import os
 import sys
 import argparse
-import json
+import orjson
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from requests_cache import DO_NOT_CACHE, NEVER_EXPIRE
 
 # Add ../lib to the Python path
 sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
 
-from lib.base_utils import get_platform_paths, clean_html_content, load_db, save_all
-from lib.oauth_session import setup_oauth_session
+from lib.base_utils import get_platform_paths, clean_html_content, load_db, load_spool, save_all
+from lib.oauth_session import setup_oauth_session, ensure_fresh_token
 from lib.message_model import BaseMessage
 
 # --- 1. CONFIG & PATHS ---
@@ -19,11 +21,20 @@ SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 BASE_DATA_DIR = os.path.join(SCRIPT_DIR, os.getenv('DATA_DIR', './../data'))
 PATHS = get_platform_paths("aweber", BASE_DATA_DIR)
 TOKEN_FILE = os.path.join(SCRIPT_DIR, 'aweber_token.json')
+DETAIL_CONCURRENCY = 8
+
+# --- DETAIL FETCHING ---
+
+def fetch_detail(aweber, url, expire_after):
+    """Fetches a single broadcast through the shared (pooled, cached) session."""
+    resp = aweber.get(url, expire_after=expire_after)
+    return orjson.loads(resp.content) if resp.status_code == 200 else None
 
 def main():
     parser = argparse.ArgumentParser(description="AWeber Exporter v2.8 (Ultra-Clean)")
     parser.add_argument('--full', action='store_true')
     parser.add_argument('--from-date', help="YYYY-MM-DD")
+    parser.add_argument('--resume', action='store_true', help="Reuse messages spooled by an interrupted run")
     args = parser.parse_args()
 
     # --- 2. DB SETUP ---
@@ -42,14 +53,15 @@ def main():
         auth_url="https://auth.aweber.com/oauth2/authorize",
         token_url="https://auth.aweber.com/oauth2/token",
         redirect_uri=os.getenv('AWEBER_REDIRECT_URI', 'https://localhost'),
-        scopes=['account.read', 'list.read', 'email.read']
+        scopes=['account.read', 'list.read', 'email.read'],
+        cache_name=os.path.join(PATHS['base'], 'aweber_http_cache')
     )
 
     # --- 4. API LOGIC ---
     print(f"🔍 Syncing AWeber...")
-    acc_data = aweber.get("https://api.aweber.com/1.0/accounts").json()
+    acc_data = orjson.loads(aweber.get("https://api.aweber.com/1.0/accounts").content)
     account = acc_data['entries'][0]
-    list_data = aweber.get(account['lists_collection_link']).json()
+    list_data = orjson.loads(aweber.get(account['lists_collection_link']).content)
     target_list = list_data['entries'][0]
     list_name = target_list['name']
 
@@ -57,43 +69,66 @@ def main():
     if not args.full:
         messages = {mid: m for mid, m in messages.items() if m.status == 'sent'}
 
-    for status in ['draft', 'scheduled', 'sent']:
-        print(f"📥 Checking {status}...")
-        bc_url = target_list.get(f"{status}_broadcasts_link") or f"https://api.aweber.com/1.0/accounts/{account['id']}/lists/{target_list['id']}/broadcasts"
+    # Every processed message is spooled as NDJSON until the final save succeeds
+    spooled = load_spool(PATHS['spool'], BaseMessage) if args.resume else {}
+    if spooled: print(f"♻️ Resuming with {len(spooled)} spooled messages")
+    messages.update(spooled)
+
+    # requests sessions are safe to share across threads; the pooled adapter holds more connections than workers
+    with ThreadPoolExecutor(max_workers=DETAIL_CONCURRENCY) as pool, open(PATHS['spool'], 'wb') as spool:
+        # Rewrite what was recovered so a torn line from the crash doesn't linger
+        spool.writelines(orjson.dumps(m.to_dict()) + b'\n' for m in spooled.values())
+        for status in ['draft', 'scheduled', 'sent']:
+            print(f"📥 Checking {status}...")
+            bc_url = target_list.get(f"{status}_broadcasts_link") or f"https://api.aweber.com/1.0/accounts/{account['id']}/lists/{target_list['id']}/broadcasts"
         
-        url = bc_url
-        params = {'status': status} if 'broadcasts' in url and status != 'draft' else {}
+            url = bc_url
+            params = {'status': status} if 'broadcasts' in url and status != 'draft' else {}
+            params['ws.size'] = 100  # API max; next_collection_link carries it over
         
-        while url:
-            resp = aweber.get(url, params=params if url == bc_url else None)
-            if resp.status_code != 200: break
+            while url:
+                resp = aweber.get(url, params=params if url == bc_url else None)
+                if resp.status_code != 200: break
             
-            page = resp.json()
-            for entry in page.get('entries', []):
-                mid = str(entry.get('id') or entry.get('broadcast_id') or entry.get('draft_id'))
-                mdate = entry.get('sent_at') or entry.get('scheduled_for') or entry.get('created_at') or "1970-01-01"
+                page = orjson.loads(resp.content)
+                pending, ready = [], []
+                for entry in page.get('entries', []):
+                    mid = str(entry.get('id') or entry.get('broadcast_id') or entry.get('draft_id'))
+                    mdate = entry.get('sent_at') or entry.get('scheduled_for') or entry.get('created_at') or "1970-01-01"
                 
-                if not args.full:
-                    if status == 'sent' and mdate < start_filter: continue
-                    if mid in messages and messages[mid].status == 'sent': continue
+                    if not args.full:
+                        if status == 'sent' and mdate < start_filter: continue
+                        if mid in messages and messages[mid].status == 'sent': continue
+                    if mid in spooled: continue
 
-                print(f"   + Processing: {entry.get('subject', 'No Subject')[:40]}...")
-                d_resp = aweber.get(entry['self_link'])
-                if d_resp.status_code != 200: continue
-                
-                d = d_resp.json()
-                cleaned = clean_html_content(d.get('body_html'))
+                    print(f"   + Processing: {entry.get('subject', 'No Subject')[:40]}...")
+                    # Some collections already embed the full body; skip the extra round-trip then
+                    if 'body_html' in entry: ready.append((mid, mdate, entry))
+                    else: pending.append((mid, mdate, entry['self_link']))
+
+                if pending:
+                    # Sent broadcasts never change, so their details are served from disk on later runs
+                    expire_after = NEVER_EXPIRE if status == 'sent' else DO_NOT_CACHE
+                    ensure_fresh_token(aweber)  # once, here, instead of racing inside the workers
+                    details = pool.map(lambda link: fetch_detail(aweber, link, expire_after), [link for _, _, link in pending])
+                    ready += [(mid, mdate, d) for (mid, mdate, _), d in zip(pending, details)]
+                for mid, mdate, d in ready:
+                    if d is None: continue
+                    cleaned = clean_html_content(d.get('body_html'))
                 
-                messages[mid] = BaseMessage(
-                    id=mid, date=mdate, status=d.get('status') or status,
-                    content=cleaned['body'], subject=d.get('subject'),
-                    preview=cleaned['preview'], source='aweber', subchannel='newsletter'
-                )
-            url = page.get('next_collection_link')
+                    messages[mid] = BaseMessage(
+                        id=mid, date=mdate, status=d.get('status') or status,
+                        content=cleaned['body'], subject=d.get('subject'),
+                        preview=cleaned['preview'], source='aweber', subchannel='newsletter'
+                    )
+                    spool.write(orjson.dumps(messages[mid].to_dict()) + b'\n')
+                spool.flush()  # a crash from here on loses at most the page in flight
+                url = page.get('next_collection_link')
 
     # --- 5. SAVE ---
     last_sync = datetime.now().isoformat()
     save_all(messages, PATHS, last_sync, list_name, title="AWeber Archive")
+    os.remove(PATHS['spool'])
     print("✅ Done!")
 
 if __name__ == "__main__":
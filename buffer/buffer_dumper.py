@@ -12,7 +12,7 @@ from buffer_message import BufferMessage
 # Add ../lib to Python path
 sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
 
-from lib.base_utils import get_platform_paths, load_db, save_all
+from lib.base_utils import get_platform_paths, load_db, save_all, date_sort_key
 
 # --- CONFIG ---
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -176,7 +176,7 @@ def generate_pdf_archive(messages, output_path, title):
     pdf.cell(0, 10, f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
     pdf.ln(10)
 
-    sorted_msgs = sorted(messages.values(), key=lambda x: x.date, reverse=True)
+    sorted_msgs = sorted(messages.values(), key=lambda x: date_sort_key(x.date), reverse=True)
 
     for i, msg in enumerate(sorted_msgs, 1):
         set_safe_font("B", 12)
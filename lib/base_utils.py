@@ -1,7 +1,15 @@
 import os
+import re
 import json
-from datetime import datetime
-from bs4 import BeautifulSoup
+import orjson
+from datetime import datetime, timezone
+import lxml.html
+from lxml import etree
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
 
 # --- PATH & DIRECTORY MANAGEMENT ---
 
@@ -15,11 +23,21 @@ def get_platform_paths(platform_name, base_data_dir):
         "base": platform_dir,
         "db": os.path.join(platform_dir, f"{platform_name}_db.json"),
         "export": os.path.join(platform_dir, f"{platform_name}_export_llm.md"),
+        "spool": os.path.join(platform_dir, f"{platform_name}_spool.ndjson"),
         "media": media_dir
     }
 
 # --- DB PERSISTENCE ---
 
+def date_sort_key(date_str):
+    """Parses an ISO-8601 date once into an epoch int; missing/garbled dates sort last."""
+    try:
+        dt = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
+    except (AttributeError, ValueError):
+        return 0
+    if dt.tzinfo is None: dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
 def load_db(db_path, message_class):
     """Loads JSON and returns metadata along with a dictionary of objects of the given class."""
     if not os.path.exists(db_path):
@@ -35,6 +53,22 @@ def load_db(db_path, message_class):
     
     return last_sync, list_name, messages
 
+def load_spool(spool_path, message_class):
+    """Loads messages spooled as NDJSON (one to_dict() per line) by an interrupted run."""
+    if not os.path.exists(spool_path):
+        return {}
+
+    messages = {}
+    with open(spool_path, 'rb') as f:
+        for line in f:
+            if not line.strip(): continue
+            try:
+                msg = message_class.from_dict(orjson.loads(line))
+            except orjson.JSONDecodeError:
+                continue  # torn last line from a crash mid-write
+            messages[msg.id] = msg
+    return messages
+
 def save_all(message_objects_dict, paths, last_sync, list_name, title="Archive"):
     """Saves the JSON database and generates Markdown in one step."""
     
@@ -49,27 +83,80 @@ def save_all(message_objects_dict, paths, last_sync, list_name, title="Archive")
         json.dump(db_data, f, indent=2, ensure_ascii=False)
     
     # 2. Save Markdown (Rendering)
-    sorted_msgs = sorted(message_objects_dict.values(), key=lambda x: x.date, reverse=True)
+    sorted_msgs = sorted(message_objects_dict.values(), key=lambda x: date_sort_key(x.date), reverse=True)
     
     print(f"📄 Writing {len(sorted_msgs)} items to {paths['export']}...")
     with open(paths['export'], 'w', encoding='utf-8') as f:
-        f.write(f"# {title}: {list_name}\n")
-        f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-        
-        for i, msg in enumerate(sorted_msgs, 1):
-            f.write(msg.to_markdown(i, media_base_path=paths.get('media')))
+        f.write(f"# {title}: {list_name}\nGenerated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+        # Lazy generator: one writelines() call, but fragments are never all held at once
+        f.writelines(msg.to_markdown(i, media_base_path=paths.get('media')) for i, msg in enumerate(sorted_msgs, 1))
                 
     print(f"✅ Persistence complete (JSON + MD).")
 
 # --- HTML PROCESSING ---
 
+# Cheap pre-filter: well-formed blocks are dropped before parsing, so no nodes are allocated for them.
+# Unclosed blocks slip through and are removed from the parsed tree instead.
+SCRIPT_STYLE_RE = re.compile(r'<(script|style)\b[^>]*>.*?</\1\s*>', re.DOTALL | re.IGNORECASE)
+
+def _lower(expr):
+    """XPath 1.0 has no lower-case(); translate() does the job for ASCII."""
+    return f"translate({expr}, 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')"
+
+# Compiled once; one C-level traversal, no Python callback per element.
+# Results come back in document order; the caller re-ranks so the meta still wins.
+PREHEADER_XPATH = etree.XPath(
+    "//meta[@name='x-preheader']/@content | "
+    f"//*[contains({_lower('@class')}, 'preheader') or contains({_lower('@id')}, 'preheader')]"
+)
+
+# body_html is already-decoded text; pinning the encoding stops a stray <meta charset>/XML declaration from re-decoding it
+UTF8_HTML_PARSER = lxml.html.HTMLParser(encoding='utf-8')
+
+def _clean_with_lexbor(html_content, find_preview=True):
+    """Fast path: selectolax's Lexbor (C) parser."""
+    tree = LexborHTMLParser(html_content)
+    preview_text = ""
+    if find_preview:
+        for meta in tree.css('meta[name="x-preheader"]'):
+            preview_text = (meta.attributes.get('content') or "").strip()
+            if preview_text: break
+        if not preview_text:
+            for node in tree.css('[class*=preheader i], [id*=preheader i]'):
+                preview_text = node.text(strip=True)
+                if preview_text: break
+    tree.strip_tags(['script', 'style'])
+    if tree.body is None: return {"preview": preview_text, "body": ""}
+    texts = (n.text_content.strip() for n in tree.body.traverse(include_text=True) if n.tag == '-text')
+    return {"preview": preview_text, "body": "\n\n".join(t for t in texts if t)}
+
+def _clean_with_lxml(html_content, find_preview=True):
+    """Fallback when selectolax is not installed: plain lxml.html, no per-node Python wrappers."""
+    try:
+        # Bytes, because lxml rejects str input that carries an <?xml ... encoding=...?> declaration
+        root = lxml.html.document_fromstring(html_content.encode('utf-8'), parser=UTF8_HTML_PARSER)
+    except (etree.ParserError, ValueError):
+        return {"preview": "", "body": ""}
+    preview_text = ""
+    if find_preview:
+        # Meta @content hits are strings, class/id hits are elements; a stable sort puts
+        # the meta first wherever it sits (fragments may place it after the element)
+        for match in sorted(PREHEADER_XPATH(root), key=lambda m: not isinstance(m, str)):
+            preview_text = (match if isinstance(match, str) else match.text_content()).strip()
+            if preview_text: break
+    etree.strip_elements(root, 'script', 'style', with_tail=False)
+    body = root.body
+    texts = (t.strip() for t in body.itertext()) if body is not None else ()
+    return {"preview": preview_text, "body": "\n\n".join(t for t in texts if t)}
+
 def clean_html_content(html_content):
     if not html_content: return {"preview": "", "body": ""}
-    soup = BeautifulSoup(html_content, 'html.parser')
-    preview_text = ""
-    meta_pre = soup.find('meta', attrs={'name': 'x-preheader'})
-    if meta_pre and meta_pre.get('content'):
-        preview_text = meta_pre.get('content').strip()
-    for script in soup(["script", "style"]): script.extract()
-    body_text = soup.get_text(separator='\n\n', strip=True)
-    return {"preview": preview_text, "body": body_text}
\ No newline at end of file
+    # Plain-text body (no tags, no entities): nothing for a parser to do
+    if '<' not in html_content and '&' not in html_content:
+        return {"preview": "", "body": html_content.strip()}
+    html_content = SCRIPT_STYLE_RE.sub(' ', html_content)  # a space, so the text on either side doesn't fuse
+    # Both preheader strategies need the word somewhere; a C-level substring scan is far cheaper than a DOM walk
+    find_preview = 'preheader' in html_content.lower()
+    if LexborHTMLParser is not None:
+        return _clean_with_lexbor(html_content, find_preview)
+    return _clean_with_lxml(html_content, find_preview)
\ No newline at end of file